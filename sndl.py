@@ -4,11 +4,33 @@ import urllib.parse
 import http.client
 import sys
 import os
+import shutil
 import socket
 import time
+import math
 import re
 import argparse
 import textwrap
+import threading
+import collections
+import io
+import ssl
+import functools
+import itertools
+import logging
+
+RANGE_RE = re.compile(r'\[([0-9,-]+)\]')
+RANGE_PAIR_RE = re.compile(r'([0-9]+)-([0-9]+)')
+RANGE_SINGLE_RE = re.compile(r'([0-9]+)')
+UNSAFE_PATH_RE = re.compile(r'[\x00-\x20\x7f]')
+# Errors taken as a lost connection; others (e.g. a full disk) are not retried.
+NETWORK_ERRORS = (ConnectionError, TimeoutError, socket.timeout, ssl.SSLError, http.client.IncompleteRead)
+MAX_RETRIES = 3
+MAX_RECONNECTS = 10
+MAX_RECONNECT_INTERVAL = 60
+SMALL_CONTENT_SIZE = 8 * 1024 * 1024
+
+log = logging.getLogger(__name__)
 
 def parse_url(url):
     """
@@ -22,13 +44,15 @@ def parse_url(url):
     Examples
     --------
     >>> print(parse_url('http://www.example.com/a[1-100].jpg'))
-    {'scheme': 'http', 'host': 'www.example.com', 'port': 0, 'path': '/a[*].jpg', 'ranges': ['1-100']}
+    {'scheme': 'http', 'host': 'www.example.com', 'port': 0, 'prefix': '/a', 'suffix': '.jpg', 'name_prefix': 'a', 'name_suffix': '.jpg', 'ranges': ['1-100']}
     >>> print(parse_url('http://www.example.com/b[2,4,8,10].jpg'))
-    {'scheme': 'http', 'host': 'www.example.com', 'port': 0, 'path': '/b[*].jpg', 'ranges': ['2', '4', '8', '10']}
+    {'scheme': 'http', 'host': 'www.example.com', 'port': 0, 'prefix': '/b', 'suffix': '.jpg', 'name_prefix': 'b', 'name_suffix': '.jpg', 'ranges': ['2', '4', '8', '10']}
     >>> print(parse_url('http://www.example.com/c[1,2-5,7,10-13,22-25].jpg'))
-    {'scheme': 'http', 'host': 'www.example.com', 'port': 0, 'path': '/c[*].jpg', 'ranges': ['1', '2-5', '7', '10-13', '22-25']}
+    {'scheme': 'http', 'host': 'www.example.com', 'port': 0, 'prefix': '/c', 'suffix': '.jpg', 'name_prefix': 'c', 'name_suffix': '.jpg', 'ranges': ['1', '2-5', '7', '10-13', '22-25']}
     >>> print(parse_url('http://www.example.com/[0001-0025].jpg'))
-    {'scheme': 'http', 'host': 'www.example.com', 'port': 0, 'path': '/[*].jpg', 'ranges': ['0001-0025']}
+    {'scheme': 'http', 'host': 'www.example.com', 'port': 0, 'prefix': '/', 'suffix': '.jpg', 'name_prefix': '', 'name_suffix': '.jpg', 'ranges': ['0001-0025']}
+    >>> print(parse_url('http://www.example.com/d[1-3]/index.html'))
+    {'scheme': 'http', 'host': 'www.example.com', 'port': 0, 'prefix': '/d', 'suffix': '/index.html', 'name_prefix': None, 'name_suffix': None, 'ranges': ['1-3']}
     """
     parsed_url = urllib.parse.urlparse(url)
 
@@ -38,18 +62,30 @@ def parse_url(url):
 
     # Path normalization
     path = parsed_url.path
-    m = re.search(r'\[([0-9,-]+)\]', path)
+    m = RANGE_RE.search(path)
     if m is None: raise ValueError("The range is not specified.")
+    prefix = path[:m.start()]
+    suffix = path[m.end():]
+
+    # File name around the number, unless the number is in a directory name
+    name_prefix = name_suffix = None
+    if os.path.basename(suffix) == suffix:
+        name_prefix = os.path.basename(prefix)
+        name_suffix = suffix
 
     return {
         'scheme': parsed_url.scheme,
         'host': host_port[0],
         'port': port,
-        'path': path[:m.start()] + '[*]' + path[m.end():],
+        'prefix': prefix,
+        'suffix': suffix,
+        'name_prefix': name_prefix,
+        'name_suffix': name_suffix,
         'ranges': [x.strip() for x in m.group()[1:-1].split(',') if not x.strip() == '']
         }
 
 
+@functools.lru_cache(maxsize = None)
 def get_digit(range_str):
     """
     Get the number of display digits.
@@ -67,14 +103,15 @@ def get_digit(range_str):
     -------
     digit
     """
-    if r := re.fullmatch(r'([0-9]+)-([0-9]+)', range_str):
+    if r := RANGE_PAIR_RE.fullmatch(range_str):
         return len(r.groups()[0])
-    elif r := re.fullmatch(r'([0-9]+)', range_str):
+    elif r := RANGE_SINGLE_RE.fullmatch(range_str):
         return len(r.group())
     else:
         raise ValueError("Wrong range format.")
 
 
+@functools.lru_cache(maxsize = None)
 def parse_range(range_str):
     """
     Generates an object of type range for the specified range.
@@ -92,18 +129,211 @@ def parse_range(range_str):
     -------
     range
     """
-    if r := re.fullmatch(r'([0-9]+)-([0-9]+)', range_str):
+    if r := RANGE_PAIR_RE.fullmatch(range_str):
         begin = int(r.groups()[0])
         end = int(r.groups()[1])
         if begin > end:
             begin, end = end, begin
-    elif r := re.fullmatch(r'([0-9]+)', range_str):
+    elif r := RANGE_SINGLE_RE.fullmatch(range_str):
         begin = end = int(r.group())
     else:
         raise ValueError("Wrong range format.")
     return range(begin, end + 1)
 
 
+def expand_sequence(ranges):
+    """
+    Expands the ranges into the zero-padded number strings.
+
+    The integers are converted and padded by `map` over C functions, so
+    no Python code runs per number. The result is lazy; the ranges are
+    validated when this is called.
+
+    Parameters
+    ----------
+    ranges : list of str
+        Range strings as returned in 'ranges' by `parse_url`.
+
+    Returns
+    -------
+    iterator of str
+
+    Examples
+    --------
+    >>> print(list(expand_sequence(['1', '08-11'])))
+    ['1', '08', '09', '10', '11']
+    """
+    return itertools.chain.from_iterable([
+        map(str.zfill, map(str, parse_range(r)), itertools.repeat(get_digit(r)))
+        for r in ranges])
+
+
+def preallocate(f, size):
+    """
+    Reserves the disk space for the whole file before writing it, so the
+    file system can allocate it in one contiguous extent.
+
+    Parameters
+    ----------
+    f : file object
+        A file opened for writing.
+    size : int or None
+        The size of the file. Nothing is done if it is unknown or 0.
+
+    Returns
+    -------
+    bool
+        True if the space was reserved. The file then already has `size`
+        bytes and must be truncated if less is written.
+    """
+    if not size or not hasattr(os, 'posix_fallocate'): return False
+    try:
+        os.posix_fallocate(f.fileno(), 0, size)
+        return True
+    except OSError:
+        # Not supported by the file system.
+        return False
+
+
+def part_path(file_path):
+    """
+    Returns the name the file is written under until it is complete.
+
+    Parameters
+    ----------
+    file_path : str
+        The name of the file to be saved.
+    """
+    return file_path + '.part'
+
+
+def downloaded_size(file_path):
+    """
+    Returns the size of the '.part' file left by an unfinished download,
+    or 0 if there is none.
+
+    Parameters
+    ----------
+    file_path : str
+        The name of the file to be saved.
+    """
+    try:
+        return os.stat(part_path(file_path)).st_size
+    except OSError:
+        return 0
+
+
+def discard_part(response, file_path, offset):
+    """
+    Checks the response to a request made with `range_header`.
+
+    416 (Range Not Satisfiable) means the '.part' file is not shorter than
+    the content. Since a '.part' file is renamed as soon as it is
+    complete, it was preallocated by a download killed before it could be
+    truncated, and its size says nothing. It is deleted, and the body of
+    the response is read.
+
+    Parameters
+    ----------
+    response : http.client.HTTPResponse
+        A response whose headers have already been received.
+    file_path : str
+        The name of the file to be saved.
+    offset : int
+        The size the request resumed from.
+
+    Returns
+    -------
+    bool
+        True if the '.part' file was deleted. The content must then be
+        requested again from the start.
+    """
+    if not offset or response.status != 416: return False
+    response.read()
+    os.remove(part_path(file_path))
+    log.info("    ==> Discarded the unfinished file. Download it again.")
+    return True
+
+
+def range_header(offset):
+    """
+    Returns the request headers that ask for the content from `offset`.
+
+    Parameters
+    ----------
+    offset : int
+        The size already downloaded, as returned by `downloaded_size`.
+    """
+    return {'Range': 'bytes={0}-'.format(offset)} if offset else {}
+
+
+def save_content(response, file_path, offset = 0):
+    """
+    Saves the body of the response to a file.
+
+    The body is written to the '.part' file (see `part_path`), which is
+    renamed to `file_path` once the whole body has been received. A file
+    under the final name is therefore always complete.
+
+    Parameters
+    ----------
+    response : http.client.HTTPResponse
+        A response whose headers have already been received.
+    file_path : str
+        The name of the file to be saved.
+    offset : int, default 0
+        The size of the '.part' file, if the request asked for the rest
+        of it with `range_header`. A partial response (206) is written
+        after `offset`; a full one (200) replaces the '.part' file.
+
+    Returns
+    -------
+    bool
+        True if the connection was lost before the whole body was received.
+    """
+    content_range = response.getheader('Content-Range', '')
+    if response.status == 206 and not content_range.startswith('bytes {0}-'.format(offset)):
+        log.info("    ==> Unexpected range: {0}".format(content_range))
+        response.read()
+    elif response.status < 300:
+        resume = response.status == 206
+        with open(part_path(file_path), mode = 'r+b' if resume else 'wb') as f:
+            if resume: f.seek(offset)
+            preallocated = preallocate(f, response.length + offset if resume and response.length else response.length)
+            try:
+                # Small bodies of known size are read in one go; the rest is streamed.
+                if response.length is not None and response.length < SMALL_CONTENT_SIZE:
+                    f.write(response.read(response.length))
+                else:
+                    shutil.copyfileobj(response, f, 1 << 16)
+            finally:
+                # Drop the reserved space a cut off body did not fill.
+                if preallocated and response.length: f.truncate()
+        # `length` counts down to 0 as the body is read; None when unknown (chunked).
+        if response.length:
+            log.info("    ==> Disconnected: {0} bytes remaining.".format(response.length))
+            return True
+        os.replace(part_path(file_path), file_path)
+    else:
+        log.info("    ==> Result: {0} {1}".format(response.status, response.reason))
+        response.read()
+    return False
+
+
+def log_target(content_path, file_path):
+    """
+    Logs the start of a download.
+
+    Parameters
+    ----------
+    content_path : str
+        The path on the host of the target content.
+    file_path : str
+        The name of the file to be saved.
+    """
+    log.info("----------------------------------------\n{0} => {1}".format(content_path, file_path))
+
+
 def get_content(conn, content_path, file_path):
     """
     Downloads the specified content and saves it to a file.
@@ -114,87 +344,500 @@ def get_content(conn, content_path, file_path):
     content_path : str
         The path on the host of the target content.
     file_path : str
-        The name of the file to be saved.
+        The name of the file to be saved. If it already exists, nothing is
+        downloaded; if an unfinished '.part' file exists, only the rest of
+        the content is requested.
     """
-    print("----------------------------------------")
-    print('{0} => {1}'.format(content_path, file_path))
+    log_target(content_path, file_path)
+    if os.path.exists(file_path):
+        log.info("    ==> Already downloaded.")
+        return False
     try:
-        conn.request('GET', content_path)
-
+        offset = downloaded_size(file_path)
+        conn.request('GET', content_path, headers = range_header(offset))
         response = conn.getresponse()
-        if response.status < 300:
-            content_length = int(response.getheader('Content-Length'))
-            with open(file_path, mode = 'wb') as f:
-                while True:
-                    while chunk := response.read(4096):
-                        f.write(chunk)
-                        content_length -= len(chunk)
-                    if content_length <= 0 or response.isclosed(): break
-            if content_length != 0:
-                print("    ==> Disconnected: {0} bytes remaining.".format(content_length))
-                return True
-        else:
-            print("    ==> Result: {0} {1}".format(response.status, response.reason))
-            response.read()
-    except (socket.timeout, http.client.RemoteDisconnected) as e:
-        print("    Exception: {0} {1}".format(type(e), e))
+        if discard_part(response, file_path, offset):
+            offset = 0
+            conn.request('GET', content_path)
+            response = conn.getresponse()
+        return save_content(response, file_path, offset)
+    except NETWORK_ERRORS as e:
+        log.info("    Exception: {0} {1}".format(type(e), e))
         return True
     except Exception as e:
-        print("    Exception: {0} {1}".format(type(e), e))
+        # The body may be left unread; http.client reopens the connection for the next request.
+        log.info("    Exception: {0} {1}".format(type(e), e))
+        conn.close()
     return False
 
 
-def do_reconnecting(conn, interval = 60 * 3):
+class PipelineReader(io.BufferedReader):
+    """
+    Buffered reader shared by all pipelined responses of one connection.
+
+    `http.client.HTTPResponse` normally makes its own reader of the socket
+    and closes it after the body; with pipelining that would throw away
+    bytes already buffered for the next response. Passing this reader in
+    place of the socket makes every response read from the same buffer.
+    """
+    def makefile(self, mode):
+        return self
+
+    def close(self):
+        # Responses must not close the shared reader; see release().
+        pass
+
+    def release(self):
+        super().close()
+
+
+def pipeline_request(path, host, offset = 0):
     """
-    Wait for the specified time and reconnect.
+    Builds a GET request to be written directly on the socket.
+
+    Parameters
+    ----------
+    path : str
+        The path on the host of the target content.
+    host : str
+        The value of the Host header.
+    offset : int, default 0
+        The size already downloaded; see `range_header`.
+
+    Returns
+    -------
+    bytes
+
+    Raises
+    ------
+    http.client.InvalidURL
+        If the path contains control characters or spaces.
+    UnicodeEncodeError
+        If the path is not ASCII, as `http.client` does.
+    """
+    if UNSAFE_PATH_RE.search(path):
+        raise http.client.InvalidURL("URL can't contain control characters. {!r}".format(path))
+    headers = ''.join('{0}: {1}\r\n'.format(*x) for x in range_header(offset).items())
+    return 'GET {0} HTTP/1.1\r\nHost: {1}\r\nConnection: keep-alive\r\n{2}\r\n'.format(path, host, headers).encode('ascii')
+
+
+def get_contents_pipelined(conn, targets, depth):
+    """
+    Downloads the targets by sending up to `depth` requests ahead of the
+    responses on the connection (HTTP/1.1 pipelining).
+
+    Since the responses arrive in the order of the requests, the file name
+    and resume offset for each one are taken from a FIFO of the requested
+    targets. Requests
+    that were sent but not answered when the connection is lost are sent
+    again after reconnecting, and a file cut off by the disconnection is
+    retried up to MAX_RETRIES times. If the server closes the connection
+    after the first response, the rest is requested one at a time.
 
     Parameters
     ----------
     conn : http.client.HTTPConnection or http.client.HTTPSConnection
-    interval : int, default 60 * 3 (3 minutes)
-        Wait time to reconnect.
+    targets : Targets
+        Source of (content_path, file_path) tuples.
+    depth : int
+        Maximum number of requests waiting for the response.
     """
-    for s in range(interval, -1, -1):
-        unit = '' if s == 1 else 's'
-        print("        ==> Reconnect after {:3d} second{}.\r".format(s, unit), end = '')
-        time.sleep(1)
-    conn.connect()
-    print("        ==> Reconnecting.                    ")
+    host = conn.host if conn.port == conn.default_port else '{0}:{1}'.format(conn.host, conn.port)
+    backlog = collections.deque()
+    pending = collections.deque()
+    end = False
+    reader = None
+    reconnect = None
+    received = 0
+    retries = collections.Counter()
+    attempt = 0
+    while True:
+        if reconnect is not None:
+            backlog.extendleft(reversed([x for x, _ in pending]))
+            pending.clear()
+            if reader: reader.release()
+            reader = None
+            attempt = do_reconnecting(conn, attempt, targets.online, wait = reconnect)
+            reconnect = None
+            received = 0
+        target = None
+        try:
+            if reader is None: reader = PipelineReader(conn.sock.makefile('rb', buffering = 0))
+            requests = []
+            while len(pending) + len(requests) < depth:
+                if backlog: target = backlog.popleft()
+                elif end: break
+                else:
+                    # Waiting with responses unread could get this connection cut too.
+                    target = targets.get(block = not pending)
+                    if target is False: break
+                    if target is None:
+                        end = True
+                        break
+                content_path, file_path = target
+                if os.path.exists(file_path):
+                    log_target(content_path, file_path)
+                    log.info("    ==> Already downloaded.")
+                    continue
+                offset = downloaded_size(file_path)
+                try:
+                    requests.append(pipeline_request(content_path, host, offset))
+                except (UnicodeError, http.client.InvalidURL) as e:
+                    # Skipped like http.client would refuse it.
+                    log_target(content_path, file_path)
+                    log.info("    Exception: {0} {1}".format(type(e), e))
+                    continue
+                pending.append((target, offset))
+            target = None
+            if requests: conn.sock.sendall(b''.join(requests))
+            if not pending: break
+
+            target, offset = pending.popleft()
+            content_path, file_path = target
+            log_target(content_path, file_path)
+            response = http.client.HTTPResponse(reader, debuglevel = conn.debuglevel, method = 'GET')
+            response.begin()
+            received += 1
+            if discard_part(response, file_path, offset): backlog.appendleft(target)
+            elif save_content(response, file_path, offset): reconnect = True
+            else: attempt = 0
+            if reconnect is None and response.will_close:
+                if received == 1 and depth > 1:
+                    log.info("    ==> Pipelining is not available. Continue without it.")
+                    depth = 1
+                reconnect = False
+        except NETWORK_ERRORS as e:
+            log.info("    Exception: {0} {1}".format(type(e), e))
+            reconnect = True
+        except Exception as e:
+            # The position in the response stream is unknown, so start over on a new connection.
+            # Without a response to blame, wait as after a disconnection, so that a
+            # repeating error runs into MAX_RECONNECTS instead of looping.
+            log.info("    Exception: {0} {1}".format(type(e), e))
+            reconnect = target is None
+        if reconnect and target is not None and retries[target] < MAX_RETRIES:
+            retries[target] += 1
+            pending.appendleft((target, offset))
+    if reader: reader.release()
+
+
+def do_reconnecting(conn, attempt = 0, online = None, wait = True):
+    """
+    Wait and reconnect. The wait doubles with every attempt, and failed
+    connections are retried the same way.
 
+    Parameters
+    ----------
+    conn : http.client.HTTPConnection or http.client.HTTPSConnection
+    attempt : int, default 0
+        Number of reconnections since the last successful download. The
+        wait is 2 ** attempt seconds, up to MAX_RECONNECT_INTERVAL. The
+        countdown is shown only when stdout is a terminal.
+    online : threading.Event, optional
+        Cleared while waiting, so that the other workers hold off their
+        next requests until the connection is back.
+    wait : bool, default True
+        If False, the first connection is made at once; the wait applies
+        only when it fails.
+
+    Returns
+    -------
+    int
+        The attempt to pass on the next call.
 
-def download(url, verbose = False):
+    Raises
+    ------
+    ConnectionError
+        If MAX_RECONNECTS attempts were made.
     """
-    Connect to the host and download the sequential numbered file.
+    if online: online.clear()
+    try:
+        while True:
+            if wait:
+                if attempt >= MAX_RECONNECTS:
+                    raise ConnectionError("Gave up reconnecting after {} attempts.".format(attempt))
+                interval = min(MAX_RECONNECT_INTERVAL, 2 ** attempt)
+                attempt += 1
+                if sys.stdout.isatty():
+                    deadline = time.monotonic() + interval
+                    while (remaining := deadline - time.monotonic()) > 0:
+                        s = math.ceil(remaining)
+                        unit = '' if s == 1 else 's'
+                        print("        ==> Reconnect after {:3d} second{}.\r".format(s, unit), end = '')
+                        time.sleep(min(1, remaining))
+                else:
+                    unit = '' if interval == 1 else 's'
+                    log.info("        ==> Reconnect after {} second{}.".format(interval, unit))
+                    time.sleep(interval)
+            wait = True
+            try:
+                conn.close()
+                conn.connect()
+                break
+            except OSError as e:
+                log.info("        ==> Exception: {0} {1}".format(type(e), e))
+        log.info("        ==> Reconnecting.                    ")
+        return attempt
+    finally:
+        if online: online.set()
+
+
+def enable_keepalive(sock):
+    """
+    Enables TCP keepalive, so that a dead peer is noticed within about a
+    minute instead of when the request times out.
 
     Parameters
     ----------
-    url : str
-        The URL of the target files, including the sequential number range.
+    sock : socket.socket
+    """
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if hasattr(socket, 'TCP_KEEPIDLE'): sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+    if hasattr(socket, 'TCP_KEEPINTVL'): sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+    if hasattr(socket, 'TCP_KEEPCNT'): sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+
+
+class TLSSession:
+    """
+    TLS settings shared by all connections to one host.
+
+    Every connection uses the same SSL context, so the certificates are
+    loaded only once, and resumes the most recent TLS session, so only the
+    first connection pays for a full handshake.
+    """
+    def __init__(self):
+        self.context = ssl.create_default_context()
+        self.session = None
+
+    def update(self, sock):
+        # A failed handshake leaves the plain socket, which has no session.
+        if isinstance(sock, ssl.SSLSocket) and sock.session is not None:
+            self.session = sock.session
+
+
+class HTTPSConnection(http.client.HTTPSConnection):
+    """
+    `http.client.HTTPSConnection` resuming the TLS session of a `TLSSession`.
+    """
+    def __init__(self, host, port = None, timeout = socket._GLOBAL_DEFAULT_TIMEOUT, tls = None):
+        self.tls = tls if tls is not None else TLSSession()
+        super().__init__(host, port, timeout = timeout, context = self.tls.context)
+
+    def connect(self):
+        http.client.HTTPConnection.connect(self)
+        self.sock = self._context.wrap_socket(self.sock, server_hostname = self.host, session = self.tls.session)
+        self.tls.update(self.sock)
+
+    def close(self):
+        # With TLS 1.3 the session ticket arrives after the handshake.
+        self.tls.update(self.sock)
+        super().close()
+
+
+class Resolver:
+    """
+    Host name lookup shared by all connections.
+
+    The addresses are resolved once and reused, so the workers do not each
+    block on getaddrinfo when they connect or reconnect. When none of the
+    addresses can be connected, they are dropped and looked up again on
+    the next attempt.
+    """
+    def __init__(self):
+        self.addresses = {}
+        self.lock = threading.Lock()
+
+    def create_connection(self, address, timeout = socket._GLOBAL_DEFAULT_TIMEOUT, source_address = None):
+        """
+        Drop-in replacement for `socket.create_connection`. The socket has
+        TCP keepalive enabled.
+        """
+        host, port = address
+        with self.lock:
+            if address not in self.addresses:
+                self.addresses[address] = [x[4][0] for x in socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)]
+            addresses = self.addresses[address]
+        error = None
+        for ip in addresses:
+            try:
+                sock = socket.create_connection((ip, port), timeout, source_address)
+                enable_keepalive(sock)
+                return sock
+            except OSError as e:
+                error = e
+        with self.lock:
+            self.addresses.pop(address, None)
+        raise error
+
+
+def open_connection(o, verbose = False, tls = None, resolver = None):
+    """
+    Open a persistent connection to the host of the parsed URL.
+
+    Parameters
+    ----------
+    o : dict
+        The result of `parse_url`.
     verbose : bool, default False
         Show detailed communication logs.
-    """
-    o = parse_url(url)
+    tls : TLSSession, optional
+        TLS settings shared with the other connections. Used for https.
+    resolver : Resolver, optional
+        Host name lookup shared with the other connections.
 
-    if o['scheme'] == 'http': client = http.client.HTTPConnection
-    if o['scheme'] == 'https': client = http.client.HTTPSConnection
+    Returns
+    -------
+    http.client.HTTPConnection or HTTPSConnection
+    """
     timeout = 60 * 5
+    if o['scheme'] == 'http': client = http.client.HTTPConnection
+    if o['scheme'] == 'https': client = functools.partial(HTTPSConnection, tls = tls)
     conn = client(o['host'], timeout = timeout) if o['port'] == 0 else client(o['host'], o['port'], timeout)
     if verbose: conn.set_debuglevel(1)
+    if resolver: conn._create_connection = resolver.create_connection
     conn.connect()
-    print("Connection: {0}://{1}:{2}/".format(o['scheme'], conn.host, conn.port))
+    return conn
 
+
+class Targets:
+    """
+    Thread-safe source of the (content_path, file_path) tuples of a
+    sequence.
+
+    The tuples are generated when a worker asks for the next one, so a
+    huge range costs neither the time to expand it before the first
+    request nor the memory to hold it. While `online` is cleared (a
+    worker is waiting to reconnect), no further targets are handed out,
+    and none at all after `stop`.
+    """
+    def __init__(self, o):
+        numbers = expand_sequence(o['ranges'])
+        self.count = sum(len(parse_range(r)) for r in o['ranges'])
+        self.iterator = self.generate(numbers, o['prefix'], o['suffix'], o['name_prefix'], o['name_suffix'])
+        self.lock = threading.Lock()
+        self.online = threading.Event()
+        self.online.set()
+        self.stopped = threading.Event()
+
+    def generate(self, numbers, prefix, suffix, name_prefix, name_suffix):
+        # About 0.4 us per target, negligible next to a request; not worth
+        # a compiled extension. Branch once instead of per number.
+        if name_suffix is None:
+            for number in numbers:
+                path = prefix + number + suffix
+                yield path, os.path.basename(path)
+        else:
+            for number in numbers:
+                yield prefix + number + suffix, name_prefix + number + name_suffix
+
+    def get(self, block = True):
+        """
+        Returns the next (content_path, file_path) tuple, or None when the
+        sequence is exhausted.
+
+        Parameters
+        ----------
+        block : bool, default True
+            If False, returns False instead of waiting while the targets
+            are held back for a reconnection.
+        """
+        if not self.online.wait(None if block else 0): return False
+        if self.stopped.is_set(): return None
+        with self.lock:
+            return next(self.iterator, None)
+
+    def stop(self):
+        """
+        Ends the sequence for all workers, including those waiting for a
+        reconnection.
+        """
+        self.stopped.set()
+        self.online.set()
+
+
+def download_worker(o, targets, verbose = False, pipeline = 1, tls = None, resolver = None):
+    """
+    Take targets and download them over one connection until none are
+    left. A file cut off by a disconnection is retried up to MAX_RETRIES
+    times after reconnecting.
+
+    Parameters
+    ----------
+    o : dict
+        The result of `parse_url`.
+    targets : Targets
+        Source of (content_path, file_path) tuples.
+    verbose : bool, default False
+        Show detailed communication logs.
+    pipeline : int, default 1
+        Number of requests sent ahead of the responses. 1 disables
+        pipelining.
+    tls : TLSSession, optional
+        TLS settings shared with the other workers. Used for https.
+    resolver : Resolver, optional
+        Host name lookup shared with the other workers.
+    """
+    conn = None
     try:
+        conn = open_connection(o, verbose, tls, resolver)
+        if pipeline > 1:
+            get_contents_pipelined(conn, targets, pipeline)
+            return
         reconnect = False
-        for r in o['ranges']:
-            digit = get_digit(r)
-            for i in parse_range(r):
-                if reconnect: do_reconnecting(conn)
-                path = o['path'].replace('[*]', '{:>0' + str(digit) + '}').format(str(i))
-                reconnect = get_content(conn, path, os.path.basename(path))
+        retry = 0
+        attempt = 0
+        target = targets.get()
+        while target is not None:
+            if reconnect: attempt = do_reconnecting(conn, attempt, targets.online)
+            reconnect = get_content(conn, *target)
+            if not reconnect: attempt = 0
+            if reconnect and retry < MAX_RETRIES: retry += 1
+            else: target, retry = targets.get(), 0
     except Exception as e:
-        print(e)
+        log.error(e)
     finally:
-        conn.close()
+        if conn: conn.close()
+
+
+def download(url, verbose = False, workers = 16, pipeline = 1):
+    """
+    Connect to the host and download the sequential numbered file.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the target files, including the sequential number range.
+    verbose : bool, default False
+        Show detailed communication logs.
+    workers : int, default 16
+        Number of files downloaded concurrently. Each worker keeps its
+        own connection alive for the whole sequence, so the throughput
+        is not limited to what a single TCP connection can carry.
+    pipeline : int, default 1
+        Number of requests each worker sends ahead of the responses
+        (HTTP/1.1 pipelining). 1 disables pipelining.
+    """
+    o = parse_url(url)
+    port = o['port'] if o['port'] != 0 else http.client.HTTPS_PORT if o['scheme'] == 'https' else http.client.HTTP_PORT
+    log.info("Connection: {0}://{1}:{2}/".format(o['scheme'], o['host'], port))
+
+    try:
+        targets = Targets(o)
+    except Exception as e:
+        log.error(e)
+        return
+
+    tls = TLSSession() if o['scheme'] == 'https' else None
+    resolver = Resolver()
+    workers = max(1, min(workers, targets.count))
+    # Daemon threads, so that an interrupted run does not wait for the downloads in progress.
+    threads = [threading.Thread(target = download_worker, args = (o, targets, verbose, pipeline, tls, resolver), daemon = True) for _ in range(workers)]
+    for t in threads: t.start()
+    try:
+        for t in threads: t.join()
+    except KeyboardInterrupt:
+        targets.stop()
+        log.info("Interrupted.")
 
 
 def make_output_dir(output_dir = './'):
@@ -211,12 +854,27 @@ def make_output_dir(output_dir = './'):
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         os.chdir(output_dir)
-        print('Output directory: {}'.format(os.getcwd()))
+        log.info('Output directory: {}'.format(os.getcwd()))
     except Exception as e:
-        print(e)
+        log.error(e)
         exit()
 
 
+class BufferedStreamHandler(logging.StreamHandler):
+    """
+    `logging.StreamHandler` that does not flush after every record.
+
+    The output is written when the stream's own buffer fills, so a long
+    sequence logged to a file or pipe does not cost a write per line.
+    """
+    def flush(self):
+        pass
+
+    def close(self):
+        super().flush()
+        super().close()
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         prog = 'sndl.py',
@@ -238,13 +896,19 @@ if __name__ == '__main__':
             Zero-padding is done according to the number of digits in the number (or the starting number in the case of a range specification).
             '''))
     parser.add_argument('-v', '--verbose', action = 'store_true', help = 'show detailed communication logs.')
+    parser.add_argument('-j', '--jobs', type = int, default = 16, help = 'number of connections downloading in parallel.')
+    parser.add_argument('-p', '--pipeline', type = int, default = 1, metavar = 'DEPTH', help = 'send up to DEPTH requests ahead of the responses on each connection (HTTP/1.1 pipelining).')
     parser.add_argument('-o', '--output', type = str, help = 'specifies the path to the output directory.')
     parser.add_argument('Target_URL', type = str, help = 'the URL of the target files, including the sequential number range.')
     args = parser.parse_args()
 
+    # Show the progress as it happens on a terminal, buffer it otherwise.
+    handler = logging.StreamHandler(sys.stdout) if sys.stdout.isatty() else BufferedStreamHandler(sys.stdout)
+    logging.basicConfig(level = logging.INFO, format = '%(message)s', handlers = [handler])
+
     if len(sys.argv) <= 1:
         parser.print_help()
         exit()
     output_dir = args.output if args.output else './download'
     make_output_dir(output_dir)
-    download(args.Target_URL, args.verbose)
+    download(args.Target_URL, args.verbose, args.jobs, args.pipeline)